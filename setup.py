@@ -21,14 +21,13 @@ setup(
     version=version,
     packages=find_packages(exclude=['tests']),
     license='Apache 2.0',
+    python_requires='>=3.7',
     classifiers=[
         'Development Status :: 4 - Beta',
         'Framework :: AsyncIO',
         'Intended Audience :: Developers',
         'Natural Language :: English',
         'License :: OSI Approved :: Apache Software License',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: 3 :: Only',
     ],
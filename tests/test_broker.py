@@ -0,0 +1,132 @@
+"""Test the event broker from tukio.broker"""
+import sys
+import asyncio
+import unittest
+
+from tukio.broker import Broker
+from tukio.task import eager_tukio_factory
+
+
+class TestBrokerDispatch(unittest.TestCase):
+
+    """
+    Test the dispatch of events to the registered handlers
+    """
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_task_factory(eager_tukio_factory)
+        self.broker = Broker(loop=self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_register_from_handler(self):
+        """
+        A handler can register another handler while it is executed, even when
+        it is started eagerly by the task factory (Python 3.12+).
+        """
+        received = []
+
+        async def other(event):
+            received.append(('other', event.data['n']))
+
+        async def handler(event):
+            received.append(('handler', event.data['n']))
+            self.broker.register(other)
+
+        async def test():
+            self.broker.register(handler)
+            self.broker.dispatch({'n': 1})
+            if sys.version_info >= (3, 12):
+                # The handler ran within `dispatch()`
+                self.assertEqual(received, [('handler', 1)])
+            await asyncio.sleep(0)
+            self.assertEqual(received, [('handler', 1)])
+
+            # Both handlers receive the next events
+            del received[:]
+            self.broker.dispatch({'n': 2})
+            await asyncio.sleep(0)
+            self.assertEqual(
+                sorted(received), [('handler', 2), ('other', 2)]
+            )
+
+        self.loop.run_until_complete(test())
+
+
+class TestBrokerRegistration(unittest.TestCase):
+
+    """
+    Test the registration of handlers in several topics at once
+    """
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.broker = Broker(loop=self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_register_many(self):
+        """
+        A handler registered with several topics is added to each of them, like
+        when registered with each topic one by one.
+        """
+        def handler(event):
+            pass
+
+        self.broker.register_many(handler, ['foo', 'bar'])
+        self.broker.register(handler, 'baz')
+        for topic in ('foo', 'bar', 'baz'):
+            self.assertEqual(self.broker._topic_handlers[topic], {handler})
+        self.assertEqual(self.broker._global_handlers, set())
+
+        # Not callable
+        with self.assertRaises(TypeError):
+            self.broker.register_many('not callable', ['foo'])
+        with self.assertRaises(TypeError):
+            self.broker.register('not callable', 'foo')
+
+    def test_register_many_global(self):
+        """
+        A global handler cannot be registered with topics, the topics are left
+        unchanged.
+        """
+        def handler(event):
+            pass
+
+        self.broker.register(handler)
+        with self.assertRaises(ValueError):
+            self.broker.register_many(handler, ['foo', 'bar'])
+        with self.assertRaises(ValueError):
+            self.broker.register(handler, 'foo')
+        self.assertEqual(self.broker._topic_handlers, {})
+        self.assertEqual(self.broker._global_handlers, {handler})
+
+    def test_unregister_many(self):
+        """
+        A handler is unregistered from all the topics it is registered with
+        before `KeyError` is raised for the other topics. Topics left without
+        any handler are removed.
+        """
+        def handler(event):
+            pass
+
+        def other(event):
+            pass
+
+        self.broker.register_many(handler, ['foo', 'bar'])
+        self.broker.register(other, 'foo')
+        with self.assertRaises(KeyError) as cm:
+            self.broker.unregister_many(handler, ['foo', 'unknown', 'bar'])
+        self.assertIn("['unknown']", str(cm.exception))
+        self.assertEqual(self.broker._topic_handlers, {'foo': {other}})
+
+        # All topics known
+        self.broker.unregister_many(other, ['foo'])
+        self.assertEqual(self.broker._topic_handlers, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
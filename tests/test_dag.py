@@ -61,6 +61,23 @@ class TestDAG(TestCase):
         self.assertEqual(set(copy.root_nodes()), set(dag.root_nodes()))
         self.assertEqual(set(copy.leaves()), set(dag.leaves()))
 
+        # Updating the copy leaves the original DAG untouched
+        copy.delete_edge('t1', 't2')
+        self.assertIn(('t1', 't2'), dag.edges())
+        self.assertEqual(dag.predecessors('t2'), ['t1'])
+
+    def test_toposort(self):
+        dag = self.get_valid_dag()
+        edges = set(dag.edges())
+        order = dag._toposort()
+
+        # Each node comes after all its predecessors
+        self.assertEqual(set(order), set(dag.graph))
+        for pred, succ in edges:
+            self.assertLess(order.index(pred), order.index(succ))
+        # The graph is not altered by the sort
+        self.assertEqual(set(dag.edges()), edges)
+
     def test_add_node(self):
         dag = self.get_valid_dag()
 
@@ -72,6 +89,43 @@ class TestDAG(TestCase):
         dag.add_node('t7')
         self.assertIn('t7', dag.leaves())
 
+    def test_add_edge(self):
+        dag = self.get_valid_dag()
+
+        # Node does not exist
+        with self.assertRaises(KeyError):
+            dag.add_edge('t1', 'unknown')
+
+        # Edges creating a cycle are rejected
+        with self.assertRaises(DAGValidationError):
+            dag.add_edge('t5', 't1')
+        with self.assertRaises(DAGValidationError):
+            dag.add_edge('t3', 't3')
+        self.assertNotIn(('t5', 't1'), dag.edges())
+        self.assertTrue(dag.is_valid())
+
+        # Add edge
+        dag.add_edge('t6', 't5')
+        self.assertIn(('t6', 't5'), dag.edges())
+
+    def test_add_edges_from(self):
+        dag = self.get_valid_dag()
+        dag.add_node('t7')
+
+        # None of the edges is kept if one of them is invalid
+        with self.assertRaises(KeyError):
+            dag.add_edges_from([('t6', 't7'), ('t7', 'unknown')])
+        self.assertNotIn(('t6', 't7'), dag.edges())
+        with self.assertRaises(DAGValidationError):
+            dag.add_edges_from([('t5', 't7'), ('t7', 't1')])
+        self.assertNotIn(('t5', 't7'), dag.edges())
+        self.assertTrue(dag.is_valid())
+
+        # Add edges (existing ones are ignored)
+        dag.add_edges_from([('t1', 't2'), ('t5', 't7'), ('t6', 't7')])
+        self.assertEqual(set(dag.predecessors('t7')), set(['t5', 't6']))
+        self.assertEqual(dag.predecessors('t2'), ['t1'])
+
     def test_delete_node(self):
         dag = self.get_valid_dag()
 
@@ -84,3 +138,37 @@ class TestDAG(TestCase):
         self.assertNotIn('t1', dag.leaves())
         self.assertNotIn(('t1', 't2'), dag.edges())
         self.assertNotIn(('t1', 't3'), dag.edges())
+        self.assertEqual(dag.predecessors('t2'), [])
+        self.assertEqual(dag.predecessors('t3'), ['t6'])
+        self.assertEqual(set(dag.root_nodes()), set(['t2', 't6']))
+
+    def test_freeze(self):
+        dag = self.get_valid_dag()
+        dag.freeze()
+
+        # Frozen DAGs cannot be updated
+        with self.assertRaises(RuntimeError):
+            dag.add_node('t7')
+        with self.assertRaises(RuntimeError):
+            dag.add_edge('t6', 't5')
+        with self.assertRaises(RuntimeError):
+            dag.delete_edge('t1', 't2')
+        with self.assertRaises(RuntimeError):
+            dag.delete_node('t1')
+
+        # Leaves share the same empty frozenset
+        self.assertIs(dag.graph['t3'], dag.graph['t5'])
+
+        # Graph traversals still work
+        self.assertEqual(dag.validate(), 'graph is a valid DAG')
+        self.assertEqual(set(dag.root_nodes()), set(['t1', 't6']))
+        self.assertEqual(set(dag.predecessors('t3')), set(['t1', 't6']))
+        self.assertEqual(dag.successors('t2'), ['t4'])
+        self.assertTrue(dag.is_valid())
+
+        # A copy can be updated
+        copy = dag.copy()
+        copy.add_node('t7')
+        copy.add_edge('t6', 't7')
+        self.assertIn(('t6', 't7'), copy.edges())
+        self.assertNotIn('t7', dag.graph)
@@ -471,6 +471,19 @@ class TestTaskFactory(unittest.TestCase):
         # uuid4() always returns a 36-chars long ID
         self.assertEqual(len(task.uid), 36)
 
+    def test_tukio_task_push_event(self):
+        """
+        Events pushed to a `TukioTask` land into its receiving queue, in order
+        """
+        self.loop.set_task_factory(tukio_factory)
+        task = asyncio.ensure_future(self.holder.do_it('foo'))
+        task.push_event('event1')
+        self.loop.run_until_complete(task.data_received('event2'))
+        self.assertIs(task.queue, self.holder.queue)
+        self.assertEqual(task.queue.get_nowait(), 'event1')
+        self.assertEqual(task.queue.get_nowait(), 'event2')
+        self.loop.run_until_complete(task)
+
 
 class TestTaskTemplate(unittest.TestCase):
 
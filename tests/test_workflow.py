@@ -1,8 +1,15 @@
 import asyncio
+from copy import deepcopy
+from datetime import datetime, timezone, timedelta
 from unittest import TestCase
-from tukio.task import register, TaskHolder, tukio_factory
+from tukio.task import (
+    register, TaskHolder, TaskTemplate, UnknownTaskName, tukio_factory,
+)
 from tukio.utils import FutureState
-from tukio.workflow import Workflow, WorkflowTemplate
+from tukio.workflow import (
+    Workflow, WorkflowTemplate, WorkflowRootTaskError, OverrunPolicyHandler,
+    TemplateGraphError,
+)
 
 
 @register('basic', 'execute')
@@ -102,6 +109,14 @@ TEMPLATES = {
 
 class TestWorkflow(TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        # Workflow templates are immutable, share them between all tests
+        cls.templates = {
+            key: WorkflowTemplate.from_dict(tmpl)
+            for key, tmpl in TEMPLATES.items()
+        }
+
     def setUp(self):
         self.loop = asyncio.new_event_loop()
         self.loop.set_task_factory(tukio_factory)
@@ -111,17 +126,130 @@ class TestWorkflow(TestCase):
         self.loop.close()
 
     def test_workflow_schema(self):
-        tmpl = TEMPLATES['ok']
+        tmpl = dict(TEMPLATES['ok'])
         template = WorkflowTemplate.from_dict(tmpl)
         self.assertEqual(template.schema, 1)
         tmpl['schema'] = 5
         template = WorkflowTemplate.from_dict(tmpl)
         self.assertEqual(template.schema, 5)
 
+    def test_workflow_template_cache(self):
+        # Templates without ID are never shared
+        tmpl = TEMPLATES['ok']
+        self.assertIsNot(
+            WorkflowTemplate.from_dict(tmpl), WorkflowTemplate.from_dict(tmpl)
+        )
+        # Templates with the same ID and content are shared
+        tmpl = dict(TEMPLATES['ok'], id='cached')
+        template = WorkflowTemplate.from_dict(tmpl)
+        self.assertIs(WorkflowTemplate.from_dict(dict(tmpl)), template)
+        self.assertEqual(template.uid, 'cached')
+        # Any change in the dict leads to a new template
+        tmpl['timeout'] = 10
+        other = WorkflowTemplate.from_dict(tmpl)
+        self.assertIsNot(other, template)
+        self.assertEqual(other.timeout, 10)
+
+    def test_workflow_template_cache_isolation(self):
+        # Updating the source dict in place must not alter the cached template
+        tmpl = deepcopy(TEMPLATES['ok'])
+        tmpl.update(id='isolated', topics=['a'])
+        tmpl['tasks'][0]['config'] = {'a': 1}
+        tmpl['tasks'][0]['topics'] = ['a']
+        template = WorkflowTemplate.from_dict(tmpl)
+        tmpl['topics'].append('b')
+        tmpl['tasks'][0]['config']['a'] = 2
+        tmpl['tasks'][0]['topics'].append('b')
+        fresh = deepcopy(TEMPLATES['ok'])
+        fresh.update(id='isolated', topics=['a'])
+        fresh['tasks'][0]['config'] = {'a': 1}
+        fresh['tasks'][0]['topics'] = ['a']
+        self.assertIs(WorkflowTemplate.from_dict(fresh), template)
+        self.assertEqual(template.topics, ['a'])
+        task = {t.uid: t for t in template.tasks}['1']
+        self.assertEqual(task.config, {'a': 1})
+        self.assertEqual(task.topics, ['a'])
+        # Values not serializable as JSON are never cached (a datetime must
+        # not be mistaken for its string representation)
+        now = datetime.now(timezone.utc)
+        tmpl = dict(TEMPLATES['ok'], id='not-cached', timeout=now)
+        self.assertIsNot(
+            WorkflowTemplate.from_dict(tmpl), WorkflowTemplate.from_dict(tmpl)
+        )
+        tmpl = dict(TEMPLATES['ok'], id='not-cached', timeout=str(now))
+        self.assertIsNot(
+            WorkflowTemplate.from_dict(tmpl),
+            WorkflowTemplate.from_dict(dict(tmpl, timeout=now))
+        )
+
+    def test_workflow_template_successors(self):
+        template = self.templates['ok']
+        by_id = {task.uid: task for task in template.tasks}
+        for up_id, down_ids in TEMPLATES['ok']['graph'].items():
+            successors = template.successors(by_id[up_id])
+            self.assertEqual(
+                set(task.uid for task in successors), set(down_ids)
+            )
+            # Same result from an updatable copy of the template
+            successors = template.copy().successors(by_id[up_id])
+            self.assertEqual(
+                set(task.uid for task in successors), set(down_ids)
+            )
+
+    def test_workflow_template_graph_error(self):
+        # Unknown upstream task
+        tmpl = deepcopy(TEMPLATES['ok'])
+        tmpl['graph']['unknown'] = ['1']
+        with self.assertRaises(TemplateGraphError):
+            WorkflowTemplate.from_dict(tmpl)
+        # Unknown downstream task
+        tmpl = deepcopy(TEMPLATES['ok'])
+        tmpl['graph']['4'] = ['unknown']
+        with self.assertRaises(TemplateGraphError):
+            WorkflowTemplate.from_dict(tmpl)
+
+    def test_workflow_template_root(self):
+        template = self.templates['ok']
+        self.assertEqual(template.root().uid, '1')
+        self.assertTrue(template.validate())
+        # Several root tasks
+        tmpl = deepcopy(TEMPLATES['ok'])
+        tmpl['graph']['1'] = ['2']
+        template = WorkflowTemplate.from_dict(tmpl)
+        with self.assertRaises(WorkflowRootTaskError):
+            template.root()
+        with self.assertRaises(WorkflowRootTaskError):
+            template.validate()
+
+    def test_workflow_template_validate(self):
+        template = WorkflowTemplate()
+        root = TaskTemplate('basic')
+        template.add(root)
+        self.assertTrue(template.validate())
+        self.assertTrue(template.validate())
+        # Any update of the template requires a new validation
+        unknown = TaskTemplate('unknown')
+        template.add(unknown)
+        with self.assertRaises(WorkflowRootTaskError):
+            template.validate()
+        template.link(root, unknown)
+        with self.assertRaises(UnknownTaskName):
+            template.validate()
+        template.delete(unknown)
+        self.assertTrue(template.validate())
+
+    def test_no_instance_dict(self):
+        # Templates and workflows are instantiated very often, all their
+        # attributes must be declared in `__slots__`.
+        template = self.templates['ok']
+        for obj in (template, Workflow(template),
+                    OverrunPolicyHandler(template)):
+            self.assertFalse(hasattr(obj, '__dict__'))
+
     def test_basic_workflow(self):
         async def test():
             tmpl = TEMPLATES['ok']
-            wflow = Workflow(WorkflowTemplate.from_dict(tmpl))
+            wflow = Workflow(self.templates['ok'])
             wflow.run({'initial': 'data'})
             await wflow
             # These tasks have finished
@@ -132,13 +260,49 @@ class TestWorkflow(TestCase):
             # The workflow finished properly
             self.assertTrue(wflow.done())
             self.assertEqual(FutureState.get(wflow), FutureState.finished)
+            self.assertEqual(wflow.result(), set(wflow._tasks_by_id.values()))
+            self.assertEqual(set(wflow.tasks), wflow.result())
+            # Execution start and end are UTC datetimes
+            report = wflow.report()
+            start, end = report['exec']['start'], report['exec']['end']
+            self.assertEqual(start.utcoffset(), timedelta(0))
+            self.assertEqual(end.utcoffset(), timedelta(0))
+            self.assertGreaterEqual(end, start)
+            self.assertIn('end={}>'.format(end), str(wflow))
+            # Only tasks of the workflow can update their next tasks
+            with self.assertRaises(RuntimeError):
+                wflow.set_next_tasks([])
+        self.loop.run_until_complete(test())
+
+    def test_workflow_fast_forward(self):
+        async def test():
+            wflow = Workflow(self.templates['ok'])
+            wflow.run({'initial': 'data'})
+            await wflow
+            report = wflow.report()
+            # Pretend task '4' was never executed (its inputs are the outputs
+            # of its parent)
+            for task_dict in report['tasks']:
+                if task_dict['id'] == '2':
+                    task_dict['exec']['outputs'] = {'from': '2'}
+                elif task_dict['id'] == '4':
+                    del task_dict['exec']
+            rescued = Workflow(self.templates['ok'])
+            rescued.fast_forward(report)
+            await rescued
+            self.assertEqual(FutureState.get(rescued), FutureState.finished)
+            self.assertTrue(rescued._tasks_by_id['4'].done())
+            # The end of the execution is still recorded as a UTC datetime
+            end = rescued.report()['exec']['end']
+            self.assertEqual(end.utcoffset(), timedelta(0))
+            self.assertGreaterEqual(end, report['exec']['end'])
+            self.assertIn('end={}>'.format(end), str(rescued))
         self.loop.run_until_complete(test())
 
     def test_workflow_crash(self):
         async def test():
-            tmpl = TEMPLATES['crash_test']
             # Test crash at task __init__
-            wflow = Workflow(WorkflowTemplate.from_dict(tmpl))
+            wflow = Workflow(self.templates['crash_test'])
             wflow.run({'initial': 'data'})
             await wflow
             # These tasks have finished
@@ -155,6 +319,7 @@ class TestWorkflow(TestCase):
             self.assertEqual(FutureState.get(wflow), FutureState.finished)
 
             # Test crash inside a task
+            tmpl = deepcopy(TEMPLATES['crash_test'])
             tmpl['tasks'][0]['config'] = {'init_ok': None}
             wflow = Workflow(WorkflowTemplate.from_dict(tmpl))
             wflow.run({'initial': 'data'})
@@ -178,8 +343,7 @@ class TestWorkflow(TestCase):
 
     def test_workflow_cancel(self):
         async def test():
-            tmpl = TEMPLATES['workflow_cancel']
-            wflow = Workflow(WorkflowTemplate.from_dict(tmpl))
+            wflow = Workflow(self.templates['workflow_cancel'])
             wflow.run({'initial': 'data'})
             # Workflow is cancelled
             with self.assertRaises(asyncio.CancelledError):
@@ -198,8 +362,7 @@ class TestWorkflow(TestCase):
 
     def test_workflow_timeout(self):
         async def test():
-            tmpl = TEMPLATES['workflow_timeout']
-            wflow = Workflow(WorkflowTemplate.from_dict(tmpl))
+            wflow = Workflow(self.templates['workflow_timeout'])
             wflow.run({'initial': 'data'})
             # The workflow times out
             with self.assertRaises(asyncio.CancelledError):
@@ -214,8 +377,7 @@ class TestWorkflow(TestCase):
 
     def test_task_timeout(self):
         async def test():
-            tmpl = TEMPLATES['task_timeout']
-            wflow = Workflow(WorkflowTemplate.from_dict(tmpl))
+            wflow = Workflow(self.templates['task_timeout'])
             wflow.run({'initial': 'data'})
             # The workflow is OK
             await wflow
@@ -226,3 +388,82 @@ class TestWorkflow(TestCase):
                 task.exception()
             self.assertEqual(FutureState.get(task), FutureState.timeout)
         self.loop.run_until_complete(test())
+
+
+class TestOverrunPolicyHandler(TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_task_factory(tukio_factory)
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def get_templates(self, policy, key='ok'):
+        # Instances of the second template must be ignored by the handlers
+        return [
+            WorkflowTemplate.from_dict(dict(TEMPLATES[key], policy=policy))
+            for _ in range(2)
+        ]
+
+    def test_skip(self):
+        template, other = self.get_templates('skip')
+        running = [Workflow(template), Workflow(other)]
+        handler = OverrunPolicyHandler(template)
+        self.assertIsNone(handler.new_workflow(running))
+        wflow = handler.new_workflow(running[1:])
+        self.assertIsInstance(wflow, Workflow)
+        self.assertIs(wflow.template, template)
+
+    def test_start_new(self):
+        template, other = self.get_templates('start-new')
+        running = [Workflow(template), Workflow(other)]
+        wflow = OverrunPolicyHandler(template).new_workflow(running)
+        self.assertIsInstance(wflow, Workflow)
+        self.assertIs(wflow.template, template)
+
+    def test_skip_until_unlock(self):
+        template, other = self.get_templates('skip-until-unlock')
+        running = [Workflow(template), Workflow(other)]
+        handler = OverrunPolicyHandler(template)
+        # New instances are locked
+        self.assertTrue(running[0].lock.locked())
+        self.assertIsNone(handler.new_workflow(running))
+        running[0]._unlock(None)
+        wflow = handler.new_workflow(running)
+        self.assertIsInstance(wflow, Workflow)
+        self.assertIs(wflow.template, template)
+
+    def test_abort_running(self):
+        template, other = self.get_templates(
+            'abort-running', key='workflow_timeout'
+        )
+
+        async def test():
+            running = [Workflow(template), Workflow(other)]
+            for instance in running:
+                instance.run({'initial': 'data'})
+            await asyncio.sleep(0)
+            wflow = OverrunPolicyHandler(template).new_workflow(running)
+            self.assertIsInstance(wflow, Workflow)
+            self.assertIs(wflow.template, template)
+            # Only the instance from the same template is aborted
+            with self.assertRaises(asyncio.CancelledError):
+                await running[0]
+            self.assertFalse(running[0].timed_out)
+            self.assertFalse(running[1].done())
+            with self.assertRaises(asyncio.CancelledError):
+                await running[1]
+        self.loop.run_until_complete(test())
+
+    def test_override_handler(self):
+        template, _ = self.get_templates('start-new')
+
+        class MyHandler(OverrunPolicyHandler):
+            __slots__ = ()
+
+            def _start_new(self, running):
+                return None
+
+        self.assertIsNone(MyHandler(template).new_workflow([]))
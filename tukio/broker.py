@@ -79,8 +79,10 @@ class Broker(object):
                 except KeyError:
                     pass
 
-        # Schedule the execution of all registered handlers
-        for handler in handlers:
+        # Schedule the execution of all registered handlers. Iterate over a
+        # snapshot since a handler may (un)register handlers if it is started
+        # eagerly (see `eager_tukio_factory()`).
+        for handler in tuple(handlers):
             # Automatically wrap input data into an event object
             if isinstance(data, Event):
                 event = Event(data, topic=data.topic, source=data.source)
@@ -102,30 +104,63 @@ class Broker(object):
         handler can neither be registered as global when already per-topic nor
         registered as per-topic when already global.
         """
-        if not callable(coro_or_cb):
-            raise TypeError('{} is not a callable object'.format(coro_or_cb))
-
-        # Register a global handler
-        if topic is None:
-            values = self._topic_handlers.values()
-            topic_handlers = set(itertools.chain.from_iterable(values))
-            if coro_or_cb in topic_handlers:
-                raise ValueError('{} already registered with'
-                                 ' topics'.format(coro_or_cb))
-            self._global_handlers.add(coro_or_cb)
-            log.debug('registered global handler: %s', coro_or_cb)
+        # Register a per-topic handler
+        if topic is not None:
+            self.register_many(coro_or_cb, (topic,))
             return
 
-        # Register a per-topic handler
+        # Register a global handler
+        if not callable(coro_or_cb):
+            raise TypeError('{} is not a callable object'.format(coro_or_cb))
+        values = self._topic_handlers.values()
+        topic_handlers = set(itertools.chain.from_iterable(values))
+        if coro_or_cb in topic_handlers:
+            raise ValueError('{} already registered with'
+                             ' topics'.format(coro_or_cb))
+        self._global_handlers.add(coro_or_cb)
+        log.debug('registered global handler: %s', coro_or_cb)
+
+    def register_many(self, coro_or_cb, topics):
+        """
+        Registers a per-topic handler in several topics at once. Same rules as
+        `register()` apply: the handler is registered with none of the topics
+        if it is already registered as global handler.
+        """
+        if not callable(coro_or_cb):
+            raise TypeError('{} is not a callable object'.format(coro_or_cb))
         if coro_or_cb in self._global_handlers:
             raise ValueError('{} already registered as global'
                              ' handler'.format(coro_or_cb))
-        try:
-            self._topic_handlers[topic].add(coro_or_cb)
-        except KeyError:
-            self._topic_handlers[topic] = {coro_or_cb}
+        topic_handlers = self._topic_handlers
+        for topic in topics:
+            try:
+                topic_handlers[topic].add(coro_or_cb)
+            except KeyError:
+                topic_handlers[topic] = {coro_or_cb}
         log.debug('registered topic handler: %s', coro_or_cb)
 
+    def unregister_many(self, coro_or_cb, topics):
+        """
+        Unregisters a per-topic handler from several topics at once. The
+        handler is unregistered from all the topics it was registered with
+        before raising `KeyError` if it was missing from some of them.
+        """
+        topic_handlers = self._topic_handlers
+        missing = []
+        for topic in topics:
+            try:
+                handlers = topic_handlers[topic]
+                handlers.remove(coro_or_cb)
+            except KeyError:
+                missing.append(topic)
+                continue
+            if not handlers:
+                del topic_handlers[topic]
+        if missing:
+            raise KeyError('{} not registered with topics {}'.format(
+                coro_or_cb, missing
+            ))
+
     def unregister(self, coro_or_cb, topic=None):
         """
         Unregisters a per-topic or a global handler. If there's no handler left
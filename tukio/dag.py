@@ -1,10 +1,14 @@
 """
 Build DAGs
 """
-from copy import deepcopy
+import sys
 from collections import deque
 
 
+# Shared by all nodes without successor/predecessor of frozen DAGs
+_EMPTY = frozenset()
+
+
 class DAGValidationError(Exception):
     pass
 
@@ -13,21 +17,45 @@ class DAG(object):
 
     """
     Directed Acyclic Graph (DAG) implementation. This implementation uses an
-    adjacency list to represent the graph.
+    adjacency list to represent the graph (`graph`) as well as a reverse
+    adjacency list (`rgraph`) to get the predecessors of a node at once.
+    Once frozen (see `freeze()`), a DAG can no longer be updated and the
+    results of graph traversals are computed only once.
     """
 
-    __slots__ = ('graph',)
+    __slots__ = (
+        'graph', 'rgraph', '_frozen', '_topo_cache', '_roots_cache',
+    )
 
     def __init__(self):
         self.graph = {}
+        self.rgraph = {}
+        self._frozen = False
+        self._topo_cache = None
+        self._roots_cache = None
+
+    def _updating(self):
+        """
+        Must be called before any update of the graph: ensures the DAG is not
+        frozen and drops the results of previous graph traversals.
+        """
+        if self._frozen:
+            raise RuntimeError('cannot update a frozen DAG')
+        self._topo_cache = None
+        self._roots_cache = None
 
     def add_node(self, node_id):
         """
         Add a new node in the graph.
         """
+        self._updating()
+        # Interned node IDs make dict lookups faster (identity check)
+        if isinstance(node_id, str):
+            node_id = sys.intern(node_id)
         if node_id in self.graph:
             raise ValueError("node '{}' already exists".format(node_id))
         self.graph[node_id] = set()
+        self.rgraph[node_id] = set()
 
     def delete_node(self, node_id):
         """
@@ -35,20 +63,76 @@ class DAG(object):
         """
         if node_id not in self.graph:
             raise KeyError("node '{}' does not exist".format(node_id))
-        self.graph.pop(node_id)
-        # Remove all edges referencing the node just removed
-        for edges in self.graph.values():
-            if node_id in edges:
-                edges.remove(node_id)
+        self._updating()
+        # Remove all edges referencing the node
+        for succ in self.graph.pop(node_id):
+            self.rgraph[succ].remove(node_id)
+        for pred in self.rgraph.pop(node_id):
+            self.graph[pred].remove(node_id)
 
     def add_edge(self, predecessor, successor):
         """
         Add a directed edge between two specified nodes: from predecessor to
-        successor.
+        successor. Raises `DAGValidationError` if the new edge creates a cycle.
         """
         if predecessor not in self.graph or successor not in self.graph:
             raise KeyError('nodes do not exist in graph')
+        # The new edge creates a cycle only if the predecessor can already be
+        # reached from the successor.
+        if self._is_reachable(successor, predecessor):
+            raise DAGValidationError('edge {} -> {} creates a cycle'.format(
+                predecessor, successor
+            ))
+        self._add_edge(predecessor, successor)
+
+    def add_edges_from(self, edges):
+        """
+        Add all the given (predecessor, successor) edges at once. Cycles are
+        looked for only once all edges are added. If an edge references an
+        unknown node or if the new edges create a cycle, none of them is kept
+        and `KeyError` or `DAGValidationError` is raised.
+        """
+        added = []
+        try:
+            for predecessor, successor in edges:
+                if successor in self.graph.get(predecessor, ()):
+                    continue
+                self._add_edge(predecessor, successor)
+                added.append((predecessor, successor))
+            if self._has_cycle():
+                raise DAGValidationError('graph is not acyclic')
+        except (KeyError, DAGValidationError):
+            for predecessor, successor in added:
+                self.delete_edge(predecessor, successor)
+            raise
+
+    def _add_edge(self, predecessor, successor):
+        """
+        Add a directed edge without looking for cycles. The caller is in
+        charge of validating the whole graph afterwards.
+        """
+        if predecessor not in self.graph or successor not in self.graph:
+            raise KeyError('nodes do not exist in graph')
+        self._updating()
         self.graph[predecessor].add(successor)
+        self.rgraph[successor].add(predecessor)
+
+    def _is_reachable(self, source, target):
+        """
+        Returns `True` if `target` can be reached from `source` (iterative
+        depth-first search), else returns `False`.
+        """
+        stack = [source]
+        visited = {source}
+        while stack:
+            node = stack.pop()
+            if node == target:
+                return True
+            for succ in self.graph[node]:
+                if succ not in visited:
+                    visited.add(succ)
+                    stack.append(succ)
+        return False
 
     def delete_edge(self, predecessor, successor):
         """
@@ -56,7 +140,9 @@ class DAG(object):
         """
         if successor not in self.graph.get(predecessor, []):
             raise KeyError('this edge does not exist in graph')
+        self._updating()
         self.graph[predecessor].remove(successor)
+        self.rgraph[successor].remove(predecessor)
 
     def predecessors(self, node):
         """
@@ -64,7 +150,7 @@ class DAG(object):
         """
         if node not in self.graph:
             raise KeyError('node %s is not in graph' % node)
-        return [key for key in self.graph if node in self.graph[key]]
+        return list(self.rgraph[node])
 
     def successors(self, node):
         """
@@ -90,25 +176,26 @@ class DAG(object):
         # Create all nodes
         for node in graph.keys():
             dag.add_node(node)
-        # Build all edges
-        for node, successors in graph.items():
+        # Build all edges and look for cycles only once the graph is complete
+        for successors in graph.values():
             if not isinstance(successors, list):
                 raise TypeError('dict values must be lists')
-            for succ in successors:
-                dag.add_edge(node, succ)
-        dag.validate()
+        dag.add_edges_from(
+            (node, succ)
+            for node, successors in graph.items()
+            for succ in successors
+        )
         return dag
 
     def root_nodes(self):
         """
         Returns the list of all root nodes (aka nodes without predecessor).
         """
-        all_nodes = set(self.graph.keys())
-        successors = set()
-        for nodes in self.graph.values():
-            successors.update(nodes)
-        root_nodes = list(all_nodes - successors)
-        return root_nodes
+        if self._roots_cache is None:
+            self._roots_cache = [
+                node for node, preds in self.rgraph.items() if not preds
+            ]
+        return list(self._roots_cache)
 
     def validate(self):
         """
@@ -116,68 +203,134 @@ class DAG(object):
         in the graph. If there is no unlinked node and no cycle the DAG is
         valid.
         """
+        # A frozen DAG has been validated once for all
+        if self._frozen:
+            return 'graph is a valid DAG'
         self.root_nodes()
-        self._toposort()
+        # No need to compute a topological order if none is cached yet
+        if self._topo_cache is None and self._has_cycle():
+            raise DAGValidationError('graph is not acyclic')
         return 'graph is a valid DAG'
 
+    def _has_cycle(self):
+        """
+        Returns `True` if the graph contains a cycle, else returns `False`.
+        Iterative depth-first search where each node is either unvisited (0),
+        being visited (1) or visited (2): reaching a node being visited means
+        a cycle was found.
+        """
+        color = {node: 0 for node in self.graph}
+        for root in self.graph:
+            if color[root]:
+                continue
+            color[root] = 1
+            stack = [(root, iter(self.graph[root]))]
+            while stack:
+                node, successors = stack[-1]
+                for succ in successors:
+                    if color[succ] == 1:
+                        return True
+                    if color[succ] == 0:
+                        color[succ] = 1
+                        stack.append((succ, iter(self.graph[succ])))
+                        break
+                else:
+                    color[node] = 2
+                    stack.pop()
+        return False
+
     def is_valid(self):
         """
         Return `True` if the graph is a valid DAG, else return `False`.
         """
-        try:
-            self.validate()
-        except DAGValidationError:
-            return False
-        return True
+        return self._try_toposort() is not None
 
     def _toposort(self):
+        """
+        Returns the list of nodes in topological order. Raises
+        `DAGValidationError` if the graph is not acyclic.
+        """
+        sorted_nodes = self._try_toposort()
+        if sorted_nodes is None:
+            raise DAGValidationError('graph is not acyclic')
+        return list(sorted_nodes)
+
+    def _try_toposort(self):
         """
         Topological ordering of the DAG using Kahn's algorithm. This algorithm
-        detects cycles, hence ensures the graph is a DAG.
+        detects cycles: returns `None` if the graph is not acyclic.
+        The result is cached until the next update of the graph and must not
+        be altered by the caller.
         Thanks to: https://algocoding.wordpress.com/2015/04/05/topological-sorting-python/
         """
-        # determine in-degree of each node
-        in_degree = {u: 0 for u in self.graph}
-        for u in self.graph:
-            for v in self.graph[u]:
-                in_degree[v] += 1
-
-        # Collect nodes with zero in-degree
-        Q = deque()
-        for u in in_degree:
-            if in_degree[u] == 0:
-                Q.appendleft(u)
-
-        # list for order of nodes
-        edges = []
-        while Q:
+        if self._topo_cache is not None:
+            return self._topo_cache
+
+        # The in-degree of each node is its number of predecessors. The graph
+        # itself is never altered: removing a node only decrements its
+        # successors' counters.
+        in_degree = {node: len(preds) for node, preds in self.rgraph.items()}
+
+        # FIFO of nodes with zero in-degree, seeded in insertion order so that
+        # the resulting order is stable from one call to another.
+        ready = deque(
+            node for node, degree in in_degree.items() if degree == 0
+        )
+
+        # List of nodes in topological order
+        sorted_nodes = []
+        while ready:
             # Choose node of zero in-degree and 'remove' it from graph
-            u = Q.pop()
-            edges.append(u)
-            for v in self.graph[u]:
-                in_degree[v] -= 1
-                if in_degree[v] == 0:
-                    Q.appendleft(v)
-
-        if len(edges) != len(self.graph):
-            raise DAGValidationError('graph is not acyclic')
-        return edges
+            node = ready.popleft()
+            sorted_nodes.append(node)
+            for succ in self.graph[node]:
+                in_degree[succ] -= 1
+                if in_degree[succ] == 0:
+                    ready.append(succ)
+
+        # Nodes left with a non-zero in-degree belong to a cycle
+        if len(sorted_nodes) != len(self.graph):
+            return None
+        self._topo_cache = sorted_nodes
+        return sorted_nodes
 
     def edges(self):
         """
         Return a list of all edges in the graph (without duplicates)
         """
-        edges = set()
-        for node in self.graph:
-            for successor in self.graph[node]:
-                edges.add((node, successor))
-        return list(edges)
+        # Successors are stored in sets: an edge cannot be listed twice.
+        return [
+            (node, succ)
+            for node, successors in self.graph.items()
+            for succ in successors
+        ]
 
     def copy(self):
         """
-        Returns a copy of the DAG instance.
+        Returns a copy of the DAG instance. The copy is never frozen.
         """
-        graph = deepcopy(self.graph)
         dag = DAG()
-        dag.graph = graph
+        dag.graph = {node: set(succs) for node, succs in self.graph.items()}
+        dag.rgraph = {node: set(preds) for node, preds in self.rgraph.items()}
         return dag
+
+    def freeze(self):
+        """
+        Validate the DAG and make it immutable. Successor sets are turned into
+        frozensets and the results of `_toposort()` and `root_nodes()` are
+        computed once for all.
+        Any further attempt to update the graph raises `RuntimeError`.
+        """
+        if self._frozen:
+            return
+        self._toposort()
+        self.root_nodes()
+        self.graph = {
+            node: frozenset(succs) if succs else _EMPTY
+            for node, succs in self.graph.items()
+        }
+        self.rgraph = {
+            node: frozenset(preds) if preds else _EMPTY
+            for node, preds in self.rgraph.items()
+        }
+        self._frozen = True
@@ -1,5 +1,7 @@
 from .join import JoinTask
 from .task import TaskRegistry, UnknownTaskName, register, new_task, TimeoutHandle
 from .holder import TaskHolder
-from .factory import TukioTask, tukio_factory, TukioTaskError
+from .factory import (
+    TukioTask, tukio_factory, eager_tukio_factory, TukioTaskError,
+)
 from .template import TaskTemplate
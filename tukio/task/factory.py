@@ -1,3 +1,4 @@
+import sys
 import asyncio
 import logging
 import inspect
@@ -154,7 +155,14 @@ class TukioTask(asyncio.Task):
         handler shall be registered in the data broker so that any tukio task
         can receive and process events during execution.
         """
-        await self._queue.put(event)
+        self.push_event(event)
+
+    def push_event(self, event):
+        """
+        Puts an event into the task's own receiving queue right away. The
+        queue is unbounded, hence this never blocks.
+        """
+        self._queue.put_nowait(event)
 
     def in_progress(self):
         """
@@ -264,3 +272,22 @@ def tukio_factory(loop, coro):
     else:
         task = TukioTask(coro, loop=loop)
     return task
+
+
+if sys.version_info >= (3, 12):
+    def eager_tukio_factory(loop, coro, **kwargs):
+        """
+        Same as `tukio_factory()` but coroutines that are not registered as
+        Tukio tasks are eagerly executed up to their first suspension point
+        (see `asyncio.eager_task_factory`).
+        Tukio tasks are never started eagerly since their execution context
+        (holder, queue, inputs, workflow) is attached right after creation.
+        This factory is opt-in: the engine installs `tukio_factory()`.
+        """
+        try:
+            TaskRegistry.codes()[coro.cr_code]
+        except (KeyError, AttributeError):
+            return asyncio.eager_task_factory(loop, coro, **kwargs)
+        return TukioTask(coro, loop=loop)
+else:
+    eager_tukio_factory = tukio_factory
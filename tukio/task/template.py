@@ -1,3 +1,4 @@
+import sys
 import logging
 from uuid import uuid4
 
@@ -69,6 +70,9 @@ class TaskTemplate:
             "blob" and "foo" only
         """
         uid = task_dict.get('id')
+        # Task template IDs are used as keys by workflows at runtime
+        if isinstance(uid, str):
+            uid = sys.intern(uid)
         name = task_dict['name']
         config = task_dict.get('config', {})
         topics = task_dict.get('topics', [])
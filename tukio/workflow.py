@@ -1,23 +1,32 @@
+import json
+import time
 import asyncio
-import inspect
+import hashlib
 import logging
 import functools
-from copy import copy
+import contextvars
+from copy import copy, deepcopy
 from enum import Enum
 from uuid import uuid4
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 
 from tukio.dag import DAG
 from tukio.utils import FutureState, Listen, SkipTask, TimeoutHandle
 from tukio.broker import get_broker, workflow_exec_topics
 from tukio.event import Event, EventSource
 from tukio.task import (
-    TaskTemplate, TaskRegistry, UnknownTaskName, TukioTask, TukioTaskError,
+    TaskTemplate, TaskRegistry, UnknownTaskName, TukioTaskError,
 )
 
 
 log = logging.getLogger(__name__)
 
+# Workflow whose method is being executed in the current context (see the
+# `_current_workflow()` decorator)
+_current_workflow_cv = contextvars.ContextVar(
+    'tukio_current_workflow', default=None
+)
+
 
 class WorkflowError(Exception):
     pass
@@ -124,11 +133,9 @@ class OverrunPolicyHandler:
         self.policy = template.policy
 
     def new_workflow(self, running=None):
-        method = getattr(self, '_' + self.policy.name.lower())
-        return method(running or [])
-
-    def _check_wflow(self, wflow):
-        return wflow.template.uid == self.template.uid
+        # Look the handler up by name so that subclasses can override it
+        handler = getattr(self, self._handlers[self.policy])
+        return handler(running or [])
 
     def _new_wflow(self):
         return Workflow(self.template, loop=self._loop)
@@ -138,9 +145,9 @@ class OverrunPolicyHandler:
         Run a new instance of workflow only if there's no instance already
         running with the same template ID.
         """
-        for instance in running:
-            if self._check_wflow(instance):
-                return None
+        uid = self.template.uid
+        if any(instance.template.uid == uid for instance in running):
+            return None
         return self._new_wflow()
 
     def _start_new(self, _):
@@ -155,22 +162,59 @@ class OverrunPolicyHandler:
         running have been unlocked. Refer to the `Workflow` docstring for more
         details about locked/unlocked workflows.
         """
-        for instance in running:
-            if self._check_wflow(instance):
-                if instance.lock.locked():
-                    # There's at least 1 locked workflow instance
-                    return None
+        # There must be no locked instance with the same template ID
+        uid = self.template.uid
+        if any(
+            instance.template.uid == uid and instance.lock.locked()
+            for instance in running
+        ):
+            return None
         return self._new_wflow()
 
     def _abort_running(self, running):
         """
         Abort all running instances of the workflow before creating a new one.
         """
+        uid = self.template.uid
         for instance in running:
-            if self._check_wflow(instance):
+            if instance.template.uid == uid:
                 instance.cancel()
         return self._new_wflow()
 
+    # Names of the policy handlers by overrun policy
+    _handlers = {
+        OverrunPolicy.SKIP: '_skip',
+        OverrunPolicy.START_NEW: '_start_new',
+        OverrunPolicy.SKIP_UNTIL_UNLOCK: '_skip_until_unlock',
+        OverrunPolicy.ABORT_RUNNING: '_abort_running',
+    }
+
+
+class _TaskGraph:
+
+    """
+    A compact and read-only view of the DAG of a frozen workflow template,
+    holding only what the scheduler reads at runtime.
+    """
+
+    __slots__ = ('tasks', 'root', '_next_tasks')
+
+    def __init__(self, dag):
+        self.tasks = tuple(dag.graph)
+        # The single root task template, if any
+        roots = dag.root_nodes()
+        self.root = roots[0] if len(roots) == 1 else None
+        # Downstream task templates, ready to be iterated over at runtime
+        self._next_tasks = {
+            task: tuple(successors) for task, successors in dag.graph.items()
+        }
+
+    def next_tasks(self, task_tmpl):
+        """
+        Returns the tuple of downstream task templates of `task_tmpl`.
+        """
+        return self._next_tasks[task_tmpl]
+
 
 class WorkflowTemplate:
 
@@ -181,7 +225,15 @@ class WorkflowTemplate:
     It provides an API to easily build and update a consistent workflow.
     """
 
-    __slots__ = ('uid', 'topics', 'policy', 'dag', 'timeout', 'schema')
+    __slots__ = (
+        'uid', 'topics', 'policy', 'dag', 'timeout', 'schema', '_graph',
+        '_version', '_validated_version',
+    )
+
+    # Workflow templates built by `from_dict()`, indexed by a digest of the
+    # canonical representation of the source dict.
+    _cache = dict()
+    _cache_size = 512
 
     def __init__(self, uid=None, policy=None, topics=None, timeout=None,
                  schema=None):
@@ -191,9 +243,17 @@ class WorkflowTemplate:
         self.dag = DAG()
         self.timeout = timeout
         self.schema = schema or 1
+        # Compiled view of the DAG, only available once it is frozen
+        self._graph = None
+        # Bumped by every update of the graph, so that `validate()` needs to
+        # run again only if the template changed since the last validation.
+        self._version = 0
+        self._validated_version = None
 
     @property
     def tasks(self):
+        if self._graph is not None:
+            return self._graph.tasks
         return list(self.dag.graph.keys())
 
     @property
@@ -209,6 +269,7 @@ class WorkflowTemplate:
         if not isinstance(task_tmpl, TaskTemplate):
             raise TypeError("expected a 'TaskTemplate' instance")
         self.dag.add_node(task_tmpl)
+        self._version += 1
 
     def delete(self, task_tmpl):
         """
@@ -216,23 +277,36 @@ class WorkflowTemplate:
         upstream/downstream tasks.
         """
         self.dag.delete_node(task_tmpl)
+        self._version += 1
 
     def root(self):
         """
         Returns the root task. If no root task or several root tasks were found
         raises `WorkflowValidationError`.
         """
+        if self._graph is not None and self._graph.root is not None:
+            return self._graph.root
         root_task = self.dag.root_nodes()
         nb = len(root_task)
         if nb == 1:
             return root_task[0]
         raise WorkflowRootTaskError(nb)
 
+    def successors(self, task_tmpl):
+        """
+        Returns the downstream task templates of `task_tmpl` (a tuple computed
+        once for all if the template is frozen, else a new list).
+        """
+        if self._graph is None:
+            return self.dag.successors(task_tmpl)
+        return self._graph.next_tasks(task_tmpl)
+
     def link(self, up_task_tmpl, down_task_tmpl):
         """
         Create a directed link from an upstream to a downstream task.
         """
         self.dag.add_edge(up_task_tmpl, down_task_tmpl)
+        self._version += 1
 
     def unlink(self, task_tmpl1, task_tmpl2):
         """
@@ -242,6 +316,7 @@ class WorkflowTemplate:
             self.dag.delete_edge(task_tmpl1, task_tmpl2)
         except KeyError:
             self.dag.delete_edge(task_tmpl2, task_tmpl1)
+        self._version += 1
 
     @classmethod
     def from_dict(cls, wf_dict):
@@ -277,6 +352,49 @@ class WorkflowTemplate:
             {"topics": ["blob", "foo"]}
             try to trigger a workflow when data is received by the engine in
             topics "blob" and "foo" only
+
+        The underlying DAG of the returned workflow template is frozen: tasks
+        can no longer be added, deleted, linked or unlinked (use `copy()` to
+        get an updatable workflow template).
+        When the dictionary has an 'id', the workflow template is memoized and
+        the same instance is returned for all dicts with the same content. The
+        caller must therefore not update a template returned by this method.
+        """
+        # Without an explicit ID, each call must return a brand new template.
+        if wf_dict.get('id') is None:
+            return cls._build_from_dict(wf_dict)
+        try:
+            key = (cls, cls._canon_key(wf_dict))
+        except (TypeError, ValueError):
+            # Not serializable, hence not cacheable
+            return cls._build_from_dict(wf_dict)
+        try:
+            return cls._cache[key]
+        except KeyError:
+            pass
+        # The cached template must not share mutable data (configs, topics)
+        # with the caller's dict, or it would no longer match its key.
+        wf_tmpl = cls._build_from_dict(deepcopy(wf_dict))
+        # Evict the oldest entry when the cache is full
+        if len(cls._cache) >= cls._cache_size:
+            del cls._cache[next(iter(cls._cache))]
+        cls._cache[key] = wf_tmpl
+        return wf_tmpl
+
+    @staticmethod
+    def _canon_key(wf_dict):
+        """
+        Returns a stable fingerprint (16 bytes) of a workflow template dict.
+        Raises `TypeError` if the dict holds values not serializable as JSON.
+        """
+        canon = json.dumps(wf_dict, sort_keys=True)
+        return hashlib.blake2b(canon.encode(), digest_size=16).digest()
+
+    @classmethod
+    def _build_from_dict(cls, wf_dict):
+        """
+        Build a new workflow template from the given dictionary (see
+        `from_dict()`), bypassing the cache.
         """
         wf_tmpl = cls(
             uid=wf_dict.get('id'),
@@ -294,17 +412,20 @@ class WorkflowTemplate:
             task_ids[task_tmpl.uid] = task_tmpl
 
         # Graph
-        for up_id, down_ids_set in wf_dict.get('graph', {}).items():
+        edges = []
+        for up_id, down_ids in wf_dict.get('graph', {}).items():
+            if up_id not in task_ids:
+                raise TemplateGraphError(up_id)
             up_tmpl = task_ids[up_id]
-            for down_id in down_ids_set:
-                down_tmpl = task_ids[down_id]
-                wf_tmpl.link(up_tmpl, down_tmpl)
+            for down_id in down_ids:
+                if down_id not in task_ids:
+                    raise TemplateGraphError(down_id)
+                edges.append((up_tmpl, task_ids[down_id]))
+        # Cycles are looked for once all edges are added
+        wf_tmpl.dag.add_edges_from(edges)
 
-        # Graph validation
-        try:
-            wf_tmpl.dag.validate()
-        except KeyError as exc:
-            raise TemplateGraphError(exc.args[0]) from exc
+        wf_tmpl.dag.freeze()
+        wf_tmpl._graph = _TaskGraph(wf_tmpl.dag)
 
         return wf_tmpl
 
@@ -319,14 +440,12 @@ class WorkflowTemplate:
             'topics': self.topics,
             'timeout': self.timeout,
             'schema': self.schema,
-            'tasks': [],
-            'graph': {},
+            'tasks': [task_tmpl.as_dict() for task_tmpl in self.tasks],
+            'graph': {
+                up_tmpl.uid: [down_tmpl.uid for down_tmpl in down_tmpls]
+                for up_tmpl, down_tmpls in self.dag.graph.items()
+            },
         }
-        for task_tmpl in self.tasks:
-            wf_dict['tasks'].append(task_tmpl.as_dict())
-        for up_tmpl, down_tmpls in self.dag.graph.items():
-            entry = {up_tmpl.uid: list(map(lambda x: x.uid, down_tmpls))}
-            wf_dict['graph'].update(entry)
         return wf_dict
 
     def copy(self):
@@ -344,12 +463,15 @@ class WorkflowTemplate:
         task and all task names are registered tasks.
         If not valid, this method should raise either `WorkflowRootTaskError`
         or `UnknownTaskName` exceptions.
+        The result is kept until the template is updated again through its
+        own API (`add`, `delete`, `link` or `unlink`).
         """
-        root_nodes = len(self.dag.root_nodes())
-        if root_nodes != 1:
-            raise WorkflowRootTaskError(root_nodes)
+        if self._validated_version == self._version:
+            return True
+        self.root()
         for task in self.tasks:
             TaskRegistry.get(task.name)
+        self._validated_version = self._version
         return True
 
     def __str__(self):
@@ -361,50 +483,48 @@ class WorkflowTemplate:
 
 def _current_workflow(func):
     """
-    A decorator to maintain the dictionary of currently running workflows.
-    Inspired from the implementation of `asyncio.Task`.
+    A decorator to set the currently running workflow in the current context
+    while executing a method of `Workflow`.
     """
     @functools.wraps(func)
     def wrapper(self, *args, **kwargs):
-        self.__class__._current_workflows[self._loop] = self
+        token = _current_workflow_cv.set(self)
         try:
             return func(self, *args, **kwargs)
         finally:
-            self.__class__._current_workflows.pop(self._loop)
+            _current_workflow_cv.reset(token)
     return wrapper
 
 
-def _get_workflow_from_task(task):
+class _UnregisterCallback:
+
     """
-    Looks for an instance of `Workflow` linked to the task or a method of
-    `Workflow` among the done callbacks of the asyncio task. Returns None if
-    not found.
-    If the task was triggered from within a workflow it MUST have a `workflow`
-    attribute that points to it and at least one done callback that is a method
-    of `Workflow`.
+    A done callback of tasks that unregisters their `data_received` callback
+    from the event broker of their workflow (see
+    `Workflow._register_to_broker()`).
     """
-    if isinstance(task, TukioTask):
-        workflow = task.workflow
-    if workflow:
-        return workflow
 
-    for cb in task._callbacks:
-        # inspect.getcallargs() gives access to the implicit 'self' arg of
-        # the bound method but it is marked as deprecated since
-        # Python 3.5.1 and the new `inspect.Signature` object does NOT do
-        # the job :((
-        if inspect.ismethod(cb):
-            inst = cb.__self__
-        elif isinstance(cb, functools.partial):
-            try:
-                inst = cb.func.__self__
-            except AttributeError:
-                continue
-        else:
-            continue
-        if isinstance(inst, Workflow):
-            return inst
-    return None
+    __slots__ = ('workflow', 'callback', 'topics')
+
+    def __init__(self, workflow, callback, topics):
+        self.workflow = workflow
+        self.callback = callback
+        self.topics = topics
+
+    def __call__(self, future):
+        self.workflow._unregister_from_broker(
+            self.callback, future, topics=self.topics
+        )
+
+
+def _get_workflow_from_task(task):
+    """
+    Returns the instance of `Workflow` the task was created by, or None if the
+    task was not triggered from within a workflow.
+    Tasks created by a workflow are tukio tasks linked to it (see
+    `Workflow._new_task()` and `TukioTask.setup_workflow()`).
+    """
+    return getattr(task, '_workflow', None)
 
 
 class Workflow(asyncio.Future):
@@ -414,12 +534,10 @@ class Workflow(asyncio.Future):
     way of workflow execution.
     """
 
-    # Inspired from the implementation of `asyncio.Task`
-    _current_workflows = {}
-
     __slots__ = (
-        'uid', '_template', '_start', '_end', 'tasks', '_tasks_by_id',
-        '_updated_next_tasks', '_done_tasks', '_internal_exc', '_must_cancel',
+        'uid', '_template', '_start', '_end', '_start_ns', '_end_ns',
+        '_tasks_by_id',
+        '_updated_next_tasks', '_pending', '_internal_exc', '_must_cancel',
         'lock', '_broker', '_source', '_committed', '_timed_out',
     )
 
@@ -436,24 +554,35 @@ class Workflow(asyncio.Future):
         if task:
             workflow = _get_workflow_from_task(task)
         if not workflow:
-            workflow = cls._current_workflows.get(loop)
+            workflow = _current_workflow_cv.get()
         return workflow
 
+    @property
+    def tasks(self):
+        """
+        A view of the tasks executed at some point by this workflow.
+        """
+        return self._tasks_by_id.values()
+
     def __init__(self, wf_tmpl, *, loop=None, broker=None):
         super().__init__(loop=loop)
         self.uid = str(uuid4())
         self._template = wf_tmpl
         # Start and end datetime (UTC) of the execution of the workflow
         self._start, self._end = None, None
-        # Set of tasks executed at some point. Items of that set are
+        # Monotonic clock readings (ns) at start and end of the execution.
+        # The end datetime is derived from them only when required.
+        self._start_ns, self._end_ns = None, None
+        # Tasks executed at some point, by task template ID. Values are
         # instances of `asyncio.Task`
-        self.tasks = set()
         self._tasks_by_id = dict()
         # This dict references all tasks that updated the set of their
         # downstream tasks at runtime. Keys are `asyncio.Task` objects and
         # values are sets of task template IDs.
         self._updated_next_tasks = dict()
-        self._done_tasks = set()
+        # Number of tasks created whose `_run_next_tasks()` done callback has
+        # not been called yet.
+        self._pending = 0
         self._internal_exc = None
         self._must_cancel = False
         self.lock = asyncio.Lock()
@@ -526,30 +655,27 @@ class Workflow(asyncio.Future):
         if listen is Listen.everything:
             self._broker.register(callback)
         else:
-            for topic in task_tmpl.topics:
-                self._broker.register(callback, topic=topic)
+            self._broker.register_many(callback, task_tmpl.topics)
 
         # Unregister this callback as soon as the task will be done.
-        done_cb = functools.partial(self._unregister_from_broker, callback,
-                                    topics=task_tmpl.topics)
+        done_cb = _UnregisterCallback(self, callback, task_tmpl.topics)
         task.add_done_callback(done_cb)
 
     @_current_workflow
     def _unregister_from_broker(self, callback, _, topics=None):
         """
-        A very simple wrapper around `Broker.unregister()` to ignore the future
-        object passed as argument by asyncio to all done callbacks.
+        A very simple wrapper around `Broker.unregister()` and
+        `Broker.unregister_many()` to ignore the future object passed as
+        argument by asyncio to all done callbacks.
         """
-        if topics is None:
-            itertopics = [None]
-        else:
-            itertopics = topics
-        for topic in itertopics:
-            try:
-                self._broker.unregister(callback, topic=topic)
-            except KeyError as exc:
-                log.error('failed to unregister callback: %s', exc)
-                self._internal_exc = exc
+        try:
+            if topics is None:
+                self._broker.unregister(callback)
+            else:
+                self._broker.unregister_many(callback, topics)
+        except KeyError as exc:
+            log.error('failed to unregister callback: %s', exc)
+            self._internal_exc = exc
         if self._internal_exc:
             self._cancel_all_tasks()
 
@@ -577,6 +703,7 @@ class Workflow(asyncio.Future):
             self._dispatch_exec_event(WorkflowExecState.BEGIN, copy(event))
             task = self._new_task(root_tmpl, event)
             self._start = datetime.now(timezone.utc)
+            self._start_ns = time.monotonic_ns()
             # The workflow may fail to start at once
             if not task:
                 self._try_mark_done()
@@ -606,14 +733,14 @@ class Workflow(asyncio.Future):
 
         # Link the task to this workflow and send a broker BEGIN event.
         task.setup_workflow(self, task_tmpl)
-        log.debug('New task created for %s', task_tmpl)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('New task created for %s', task_tmpl)
 
         def next_tasks(future):
             asyncio.ensure_future(self._run_next_tasks(future))
 
         task.add_done_callback(next_tasks)
-        self.tasks.add(task)
-        # Create the exec dict of the task
+        self._pending += 1
         self._tasks_by_id[task_tmpl.uid] = task
         return task
 
@@ -623,29 +750,29 @@ class Workflow(asyncio.Future):
         another parent). In such a situation, it is known to be a join task.
         """
         # Push event into next_task's event queue
-        asyncio.ensure_future(next_task.data_received(event))
+        next_task.push_event(event)
 
     def _get_next_task_templates(self, task_tmpl, task):
         """
         Retrieves the downstream tasks of `task_tmpl` and filters it with the
         template IDs that (may) have been provided at runtime by `task`.
         """
-        succ_tmpls = self._template.dag.successors(task_tmpl)
+        succ_tmpls = self._template.successors(task_tmpl)
         try:
             tmpl_ids = self._updated_next_tasks[task]
         except KeyError:
             return succ_tmpls
+        succ_by_id = {tmpl.uid: tmpl for tmpl in succ_tmpls}
         filtered_tmpls = []
         for tid in tmpl_ids:
-            for tmpl in succ_tmpls:
-                if tmpl.uid == tid:
-                    filtered_tmpls.append(tmpl)
-                    break
-            else:
+            try:
+                filtered_tmpls.append(succ_by_id[tid])
+            except KeyError:
                 # This is a misconfiguration from the task. Ignore it to
                 # leave the opportunity to execute the other next tasks.
                 log.error('ID %s not in downstream tasks of %s', tid, task)
-        log.debug('%s filtered next tasks to: %s', task, filtered_tmpls)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('%s filtered next tasks to: %s', task, filtered_tmpls)
         return filtered_tmpls
 
     def _dispatch_exec_event(self, etype, data=None):
@@ -667,7 +794,7 @@ class Workflow(asyncio.Future):
         A callback to be added to each task in order to select and schedule
         asynchronously downstream tasks once the parent task is done.
         """
-        self._done_tasks.add(task)
+        self._pending -= 1
         if self._must_cancel:
             self._try_mark_done()
             return
@@ -723,14 +850,22 @@ class Workflow(asyncio.Future):
             log.debug('Suspended workflow cancelled')
             return
 
+        next_tmpls = self._get_next_task_templates(task.template, task)
+        # Leaf tasks: no event to build for downstream tasks
+        if not next_tmpls:
+            self._try_mark_done()
+            return
+
         source = EventSource(
-            workflow_template_id=self.template.uid,
+            workflow_template_id=self._template.uid,
             workflow_exec_id=self.uid,
             task_template_id=task.template.uid,
             task_exec_id=task.uid
         )
-        # Go through each child task
-        for tmpl in self._get_next_task_templates(task.template, task):
+        # Go through each child task. There must be no `await` in this loop:
+        # all downstream tasks are scheduled at once, within the same
+        # iteration of the event loop.
+        for tmpl in next_tmpls:
             # Wrap result from parent task into an event object
             event = Event(result, source=source)
             next_task = self._tasks_by_id.get(tmpl.uid)
@@ -780,9 +915,12 @@ class Workflow(asyncio.Future):
                 super().cancel()
                 data = {'cancel': True}
             else:
-                self.set_result(self.tasks)
+                self.set_result(set(self.tasks))
                 data = None
-            self._end = datetime.now(timezone.utc)
+            if self._start_ns is None:
+                self._end = datetime.now(timezone.utc)
+            else:
+                self._end_ns = time.monotonic_ns()
             self._dispatch_exec_event(exec_event, data=data)
 
     def _all_tasks_done(self):
@@ -791,10 +929,7 @@ class Workflow(asyncio.Future):
         Here, a task is considered as 'done' only if it is marked as done and
         its `_run_next_tasks()` done callback has been called.
         """
-        if self.tasks == self._done_tasks:
-            return True
-        else:
-            return False
+        return self._pending == 0
 
     def _cancel_all_tasks(self):
         """
@@ -802,15 +937,15 @@ class Workflow(asyncio.Future):
         """
         self._must_cancel = True
         cancelled = 0
-        pending = self.tasks - self._done_tasks
-        for task in pending:
-            is_cancelled = task.cancel()
-            if is_cancelled:
-                cancelled += 1
-                try:
-                    task.holder.teardown()
-                except AttributeError:
-                    pass
+        for task in self.tasks:
+            # Done tasks cannot be cancelled
+            if task.done() or not task.cancel():
+                continue
+            cancelled += 1
+            try:
+                task.holder.teardown()
+            except AttributeError:
+                pass
         return cancelled
 
     def set_next_tasks(self, task_tmpl_ids):
@@ -823,7 +958,8 @@ class Workflow(asyncio.Future):
         `task_tmpl_ids` must be a list (can be empty) of task template IDs.
         """
         task = asyncio.Task.current_task(self._loop)
-        if task not in self.tasks:
+        tmpl = getattr(task, 'template', None)
+        if tmpl is None or self._tasks_by_id.get(tmpl.uid) is not task:
             raise RuntimeError('task {} not executed by {}'.format(task, self))
         self._updated_next_tasks[task] = task_tmpl_ids
 
@@ -838,8 +974,9 @@ class Workflow(asyncio.Future):
 
         # Suspend a task means the task will be cancelled with the state
         # 'suspended', which can be used later to resume the workflow
-        for task in (self.tasks - self._done_tasks):
-            task.suspend()
+        for task in self.tasks:
+            if not task.done():
+                task.suspend()
 
         self._dispatch_exec_event(WorkflowExecState.SUSPEND)
         log.info('workflow %s has been suspended', self)
@@ -855,7 +992,8 @@ class Workflow(asyncio.Future):
 
         # Next tasks are done waiting for '_committed' asyncio event
         # The 'suspended' ones needs to be re-executed
-        for task in self._done_tasks:
+        # Iterate over a copy since `_new_task()` updates the tasks.
+        for task in list(self.tasks):
             if FutureState.get(task) is not FutureState.suspended:
                 continue
             event = Event(task.inputs, source=task.event_source)
@@ -895,7 +1033,17 @@ class Workflow(asyncio.Future):
         """
         string = '<Workflow template.uid={}, uid={}, start={}, end={}>'
         return string.format(self._template.uid, self.uid,
-                             self._start, self._end)
+                             self._start, self._get_end())
+
+    def _get_end(self):
+        """
+        Returns the end datetime (UTC) of the execution of the workflow, or
+        None if it is not done yet.
+        """
+        if self._end is None and self._end_ns is not None:
+            duration = (self._end_ns - self._start_ns) // 1000
+            self._end = self._start + timedelta(microseconds=duration)
+        return self._end
 
     def report(self):
         """
@@ -906,7 +1054,7 @@ class Workflow(asyncio.Future):
         report['exec'] = {
             'id': self.uid,
             'start': self._start,
-            'end': self._end,
+            'end': self._get_end(),
             'state': FutureState.get(self).value
         }
         # Update task descriptions to add info about their execution.
@@ -978,13 +1126,11 @@ class Workflow(asyncio.Future):
                     'as_dict': lambda: t_report
                 })
 
-                # Add this task to the tracking sets
-                self.tasks.add(t_shadow)
-                self._done_tasks.add(t_shadow)
+                # Add this task to the tracked tasks (already done)
                 self._tasks_by_id[entry.uid] = t_shadow
 
                 # Recursive browing
-                for t_next in self._template.dag.successors(entry):
+                for t_next in self._template.successors(entry):
                     browse(t_next, t_template)
         browse(self._template.root())
 